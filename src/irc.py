@@ -1,8 +1,25 @@
 """Connects to IRC."""
 
-import abc
-import re
+import selectors
 import socket
+import time
+
+# Seconds to wait for data before checking whether the connection is
+# still alive.
+_SELECT_TIMEOUT = 30
+# Seconds without data after which the server is pinged.
+_PING_AFTER = 120
+# Seconds without data after which the bot reconnects.
+_RECONNECT_AFTER = 180
+# Seconds to wait for a connection to the server to be made.
+_CONNECT_TIMEOUT = 30
+# Seconds to wait for the server to accept more data being sent.
+_SEND_TIMEOUT = 30
+# Seconds to wait before the first attempt to reconnect. The wait doubles
+# after each attempt, up to <_MAX_RECONNECT_DELAY> seconds, until the
+# server accepts the bot's registration again.
+_MIN_RECONNECT_DELAY = 5
+_MAX_RECONNECT_DELAY = 300
 
 
 class NickError(Exception):
@@ -19,7 +36,15 @@ class UnavailableError(Exception):
         super().__init__(msg)
 
 
-class IRCBot(abc.ABC):
+class _ConnectionLost(ConnectionError):
+    """Raised when the connection to the server fails.
+
+    <IRCBot> reconnects when this is raised, but not for other
+    <OSError>s, such as those raised by <IRCBot.handle>.
+    """
+
+
+class IRCBot:
     def __init__(self, nick, server, channels=None, port=6667,
                  should_log=False):
         """Connects the bot to IRC.
@@ -37,39 +62,42 @@ class IRCBot(abc.ABC):
         To use this class, you will have to subclass it and create an
         implementation for <self.handle>.
         """
-        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.__nick = nick
-        self.__server = server
-        self.__channels = set()
-        self.__port = port
+        self.nick = nick
+        self.server = server
+        # Maps the casefolded name of each channel joined to its name.
+        self.__channels = {}
+        self.__channel_names = frozenset()
+        self.port = port
         self.should_log = should_log
+        self.__buf = bytearray(8192)
+        self.__view = memoryview(self.__buf)
+        self.__buf_len = 0
+        self.__pong_bytes = b'PONG :pingis\n'
+        self.__keepalive_bytes = b'PING :keepalive\n'
+        self.__selector = selectors.DefaultSelector()
+        self.__socket = None
+        self.__reconnecting = False
+        self.__reconnect_delay = _MIN_RECONNECT_DELAY
+        # The channels to rejoin once the server accepts a reconnection.
+        self.__rejoin = set()
 
         self.log('Connecting...')
         self.__connect()
         if channels is not None:
-            for channel in channels:
-                self.join_channel(channel)
+            self.join_channels(channels)
         self.__loop()
 
-    @property
-    def nick(self):
-        """Returns this nickname (<str>)."""
-        return self.__nick
-
-    @property
-    def server(self):
-        """Returns the server (<str>) this bot is connected to."""
-        return self.__server
-
     @property
     def channels(self):
-        """Returns the channels (<set> of <str>s) this bot is in."""
-        return self.__channels
+        """Returns the channels (<frozenset> of <str>s) this bot is in."""
+        return self.__channel_names
 
-    @property
-    def port(self):
-        """Returns the port (<int>) the server this bot is on uses."""
-        return self.__port
+    def is_in_channel(self, channel):
+        """Returns whether this bot is in <channel> (<str>).
+
+        Channel names are compared case-insensitively.
+        """
+        return channel.casefold() in self.__channels
 
     def __send_command(self, string):
         """Sends a command without the need for <'\n'>.
@@ -77,54 +105,175 @@ class IRCBot(abc.ABC):
         Keyword arguments:
             string -- <str>; the message to send to the server
         """
-        self.__socket.send(bytes('{}\n'.format(string), 'UTF-8'))
+        self.__send(bytes(f'{string}\n', 'UTF-8'))
+
+    def __send(self, data):
+        """Sends <data> (<bytes>), waiting while the socket is busy.
 
-    def log(self, msg):
-        """Logs <msg> (<str>) if <self.should_log> is <True>."""
+        A <_ConnectionLost> is raised if sending fails, or if the socket
+        stays busy for <_SEND_TIMEOUT> seconds.
+        """
+        view = memoryview(data)
+        while len(view) > 0:
+            try:
+                sent = self.__socket.send(view)
+            except BlockingIOError:
+                self.__wait_writable()
+            except OSError as error:
+                raise _ConnectionLost(f'Sending failed: {error}') from error
+            else:
+                view = view[sent:]
+
+    def __wait_writable(self):
+        """Waits for the socket to become writable.
+
+        A <_ConnectionLost> is raised if it doesn't within
+        <_SEND_TIMEOUT> seconds.
+        """
+        try:
+            self.__selector.modify(self.__socket, selectors.EVENT_WRITE)
+            try:
+                ready = self.__selector.select(_SEND_TIMEOUT)
+            finally:
+                self.__selector.modify(self.__socket, selectors.EVENT_READ)
+        except OSError as error:
+            raise _ConnectionLost(f'Sending failed: {error}') from error
+        if len(ready) == 0:
+            raise _ConnectionLost('The server stopped accepting data')
+
+    def log(self, msg, *args):
+        """Logs <msg> (<str>) if <self.should_log> is <True>.
+
+        If <args> are given, <msg> is formatted with them using <%>,
+        which only happens if the message is logged.
+        """
         if self.should_log:
-            print(msg)
+            print(msg % args if args else msg)
 
     def __connect(self):
-        """Connects the bot to IRC."""
-        self.__socket.connect((self.server, self.port,))
-        self.__send_command('USER {0} {0} {0} {0}'.format(self.nick))
-        self.__send_command('NICK {}'.format(self.nick))
+        """Connects the bot to IRC using a new socket.
+
+        An <OSError> is raised if the connection couldn't be made within
+        <_CONNECT_TIMEOUT> seconds.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 262144)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.settimeout(_CONNECT_TIMEOUT)
+            sock.connect((self.server, self.port,))
+            nick = self.nick
+            registration = f'USER {nick} {nick} {nick} {nick}\nNICK {nick}\n'
+            sock.sendall(bytes(registration, 'UTF-8'))
+        except OSError:
+            sock.close()
+            raise
+        sock.setblocking(False)
+        self.__socket = sock
+        self.__selector.register(self.__socket, selectors.EVENT_READ)
+        self.__buf_len = 0
+        self.__last_received = time.monotonic()
+        self.__pinged = False
+
+    def __disconnect(self):
+        """Closes the connection, if there is one."""
+        if self.__socket is not None:
+            self.__selector.unregister(self.__socket)
+            self.__socket.close()
+            self.__socket = None
+
+    def __reconnect(self):
+        """Replaces the connection, retrying until one is made.
+
+        Each attempt waits <self.__reconnect_delay> seconds first, and
+        doubles the wait for the next one. This bot's channels are
+        rejoined once the server accepts the registration (see
+        <self.__on_welcome>).
+        """
+        self.__disconnect()
+        self.__reconnecting = True
+        self.__rejoin.update(self.__channels.values())
+        self.__channels = {}
+        self.__channel_names = frozenset()
+        while True:
+            self.log('Reconnecting in %s seconds...', self.__reconnect_delay)
+            time.sleep(self.__reconnect_delay)
+            self.__reconnect_delay = min(self.__reconnect_delay * 2,
+                                         _MAX_RECONNECT_DELAY)
+            try:
+                self.__connect()
+            except OSError as error:
+                self.log('Reconnecting failed: %s', error)
+            else:
+                return
 
     def send_message(self, msg, channel):
         """Sends <msg> (<str>) to <channel> (<str>)."""
-        self.__send_command('PRIVMSG {} :{}'.format(channel, msg))
+        self.__send_command(f'PRIVMSG {channel} :{msg}')
 
     def join_channel(self, channel):
         """Joins the channel <channel> (<str>).
 
-        A <ValueError> will be raised if <channel> is in
-        <self.channels>.
+        A <ConnectionError> will be raised if this bot is already in
+        <channel>.
         """
-        if channel in self.channels:
-            msg = '{} has already been connected to'.format(channel)
-            raise ConnectionError(msg)
-        self.log('Joining channel {}'.format(channel))
-        self.__send_command('JOIN {}'.format(channel))
-        self.__channels.add(channel)
+        self.join_channels({channel})
+
+    def join_channels(self, channels):
+        """Joins the channels <channels> (<set> of <str>s).
+
+        The <JOIN> commands are sent together in a single write. A
+        <ConnectionError> will be raised if this bot is already in any
+        of <channels>, in which case none of them are joined. Channel
+        names are compared case-insensitively.
+        """
+        new_channels = {}
+        for channel in channels:
+            key = channel.casefold()
+            if key in self.__channels:
+                msg = f'{channel} has already been connected to'
+                raise ConnectionError(msg)
+            new_channels[key] = channel
+        commands = []
+        for channel in new_channels.values():
+            self.log('Joining channel %s', channel)
+            commands.append(f'JOIN {channel}\n')
+        self.__send(bytes(''.join(commands), 'UTF-8'))
+        self.__channels.update(new_channels)
+        self.__channel_names = frozenset(self.__channels.values())
 
-    @abc.abstractmethod
     def handle(self, irc_msg):
-        """Receives IRC messages (<irc_msg> is an <IRCMessage>)."""
-        pass
+        """Receives IRC messages (<irc_msg> is an <IRCMessage>).
+
+        Subclasses must override this.
+        """
+        raise NotImplementedError
 
     @staticmethod
     def __get_message(msg):
-        """Returns an <IRCMessage> from <msg> (<str>).
+        """Returns an <IRCMessage> from <msg> (<bytes>).
 
-        <msg> should be of the form <self._msg_re>.
+        <msg> should be of the form <b':nick!user@host PRIVMSG #channel
+        :message'>. <None> is returned if it isn't. Only the nickname,
+        channel, and message are decoded.
         """
-        parts = msg.split('!')
-        nick = parts[0][1:]
-        parts = parts[1].split('PRIVMSG ')
-        parts = parts[1].split(' ', 1)
-        channel = parts[0]
-        msg = parts[1][1:]
-        return IRCMessage(channel, nick, msg, len(nick) < 17)
+        bang = msg.find(b'!')
+        if bang < 0:
+            return None
+        privmsg = msg.find(b' PRIVMSG ', bang)
+        if privmsg < 0:
+            return None
+        start = privmsg + len(b' PRIVMSG ')
+        space = msg.find(b' ', start)
+        if space < 0:
+            return None
+        # The message only starts with a colon if it has spaces in it.
+        text = space + 2 if msg[space + 1:space + 2] == b':' else space + 1
+        nick = str(msg[1:bang], 'UTF-8', 'replace')
+        return IRCMessage(str(msg[start:space], 'UTF-8', 'replace'), nick,
+                          str(msg[text:], 'UTF-8', 'replace'),
+                          len(nick) < 17)
 
     def __loop(self):
         """Starts checking for data via the socket.
@@ -132,57 +281,188 @@ class IRCBot(abc.ABC):
         If a message was retrieved, it will be sent to <self.callback>.
         This function never returns.
 
-        If <self.nick> is already in use, this will raise a
-        <ValueError>.
+        If <self.nick> is already in use when first connecting, this
+        will raise a <NickError>. If the connection fails afterwards
+        (i.e., a <_ConnectionLost> is raised), the bot reconnects. This
+        includes the server closing the connection, and the server
+        sending no data for <_RECONNECT_AFTER> seconds even though it
+        was pinged after <_PING_AFTER> seconds. Other exceptions, such
+        as those raised by <self.handle>, aren't caught.
         """
         while True:
-            irc_msg = self.__receive()
-            if len(irc_msg) > 0:
-                self.log('Received message {}'.format(irc_msg))
-            unavailable = 'Nick/channel is temporarily unavailable'
-            if unavailable in irc_msg:
-                raise UnavailableError(unavailable)
-            elif re.match(r':.*!.* PRIVMSG ##?.* :.*', irc_msg) is not None:
-                self.handle(self.__get_message(irc_msg))
-            elif 'Nickname is already in use.' in irc_msg:
-                raise NickError('Nickname already in use')
-            elif 'PING :' in irc_msg:
-                self.log('Pinging')
-                self.__ping()
+            try:
+                self.__poll()
+            except _ConnectionLost as error:
+                self.log('Lost the connection: %s', error)
+                self.__reconnect()
+
+    def __poll(self):
+        """Waits for data from the server, and handles it.
+
+        A <_ConnectionLost> is raised if the connection failed or the
+        server closed it, once the data already received has been
+        handled.
+        """
+        try:
+            ready = self.__selector.select(_SELECT_TIMEOUT)
+        except OSError as error:
+            raise _ConnectionLost(f'Waiting failed: {error}') from error
+        if len(ready) == 0:
+            self.__check_alive()
+            return
+        is_open = self.__drain()
+        self.__last_received = time.monotonic()
+        self.__pinged = False
+        for irc_msg in self.__pop_lines():
+            self.__dispatch(irc_msg)
+        if not is_open:
+            raise _ConnectionLost('The server closed the connection')
+
+    def __check_alive(self):
+        """Pings the server if it has been silent.
+
+        A <_ConnectionLost> is raised if it has been silent for too
+        long.
+        """
+        idle = time.monotonic() - self.__last_received
+        if idle > _RECONNECT_AFTER:
+            raise _ConnectionLost('The server stopped responding')
+        elif idle > _PING_AFTER and not self.__pinged:
+            self.log('Checking the connection')
+            self.__send(self.__keepalive_bytes)
+            self.__pinged = True
+
+    def __dispatch(self, irc_msg):
+        """Handles the line <irc_msg> (<bytes>) the server sent.
+
+        The line is passed to the handler in <self.__handlers> for its
+        command, and ignored if there isn't one.
+        """
+        if self.should_log and len(irc_msg) > 0:
+            self.log('Received message %s', str(irc_msg, 'UTF-8', 'replace'))
+        handler = self.__handlers.get(self.__get_command(irc_msg))
+        if handler is not None:
+            handler(self, irc_msg)
+
+    @staticmethod
+    def __get_command(msg):
+        """Returns the command (<bytes>) of the line <msg> (<bytes>).
+
+        For example, <b'PRIVMSG'> is returned for
+        <b':nick!user@host PRIVMSG #channel :message'>, and <b'433'> for
+        the numeric reply sent when a nickname is in use.
+        """
+        start = 0
+        if msg.startswith(b':'):
+            start = msg.find(b' ') + 1
+            if start == 0:
+                return b''
+        end = msg.find(b' ', start)
+        return msg[start:] if end < 0 else msg[start:end]
+
+    def __on_ping(self, irc_msg):
+        """Answers the server's <PING> (<irc_msg> is <bytes>)."""
+        self.log('Pinging')
+        self.__ping()
+
+    def __on_privmsg(self, irc_msg):
+        """Passes the channel message <irc_msg> (<bytes>) to <handle>."""
+        message = self.__get_message(irc_msg)
+        if message is not None and message.channel.startswith('#'):
+            self.handle(message)
+
+    def __on_welcome(self, irc_msg):
+        """Rejoins channels after a reconnection (<irc_msg> is <bytes>)."""
+        self.__reconnecting = False
+        self.__reconnect_delay = _MIN_RECONNECT_DELAY
+        if len(self.__rejoin) > 0:
+            channels = self.__rejoin
+            self.__rejoin = set()
+            self.join_channels(channels)
+
+    def __on_nick_in_use(self, irc_msg):
+        """Raises a <NickError> (<irc_msg> is <bytes>).
+
+        While reconnecting, the nickname may still be held by the old
+        connection, so a <_ConnectionLost> is raised instead to retry
+        later.
+        """
+        if self.__reconnecting:
+            raise _ConnectionLost('Nickname still in use')
+        raise NickError('Nickname already in use')
+
+    def __on_unavailable(self, irc_msg):
+        """Raises an <UnavailableError> (<irc_msg> is <bytes>).
+
+        As with <self.__on_nick_in_use>, a <_ConnectionLost> is raised
+        instead while reconnecting.
+        """
+        if self.__reconnecting:
+            raise _ConnectionLost('Nick/channel still unavailable')
+        raise UnavailableError('Nick/channel is temporarily unavailable')
 
     def __ping(self):
         """Pings the server."""
-        self.__send_command('PONG :pingis')
+        self.__send(self.__pong_bytes)
 
-    def __receive(self):
-        """Returns the next data the server sends (<str>)."""
-        return self.__socket.recv(2048).decode('UTF-8').strip('\n\r')
+    def __drain(self):
+        """Reads all the data currently available into the buffer.
+
+        Returns <False> if the server closed the connection, and <True>
+        otherwise. A <_ConnectionLost> is raised if reading fails.
+        """
+        while self.__buf_len < len(self.__buf):
+            try:
+                read = self.__socket.recv_into(self.__view[self.__buf_len:])
+            except BlockingIOError:
+                return True
+            except OSError as error:
+                raise _ConnectionLost(f'Reading failed: {error}') from error
+            if read == 0:
+                return False
+            self.__buf_len += read
+        return True
+
+    def __pop_lines(self):
+        """Yields each complete line (<bytes>) in the buffer.
+
+        Lines are yielded without their line endings. A partial line is
+        kept in the buffer until the rest of it arrives.
+        """
+        start = 0
+        end = self.__buf.find(b'\n', start, self.__buf_len)
+        while end >= 0:
+            yield bytes(self.__view[start:end]).rstrip(b'\r')
+            start = end + 1
+            end = self.__buf.find(b'\n', start, self.__buf_len)
+        if start == 0 and self.__buf_len == len(self.__buf):
+            # The line is longer than the buffer, so pass it on as is.
+            yield bytes(self.__buf)
+            start = self.__buf_len
+        remaining = self.__buf_len - start
+        self.__view[:remaining] = self.__view[start:self.__buf_len]
+        self.__buf_len = remaining
+
+    # Maps each IRC command to the method handling lines having it.
+    __handlers = {
+        b'001': __on_welcome,
+        b'PING': __on_ping,
+        b'PRIVMSG': __on_privmsg,
+        b'433': __on_nick_in_use,
+        b'437': __on_unavailable,
+    }
 
 
 class IRCMessage:
+    __slots__ = ('channel', 'nick', 'msg', 'is_user')
+
     def __init__(self, channel, nick, msg, is_user):
         """<channel>, <nick>, <msg> are <str>s; <is_user> is <bool>."""
-        self.__channel = channel
-        self.__nick = nick
-        self.__msg = msg
-        self.__is_user = is_user
-
-    @property
-    def channel(self):
-        return self.__channel
-
-    @property
-    def nick(self):
-        return self.__nick
-
-    @property
-    def msg(self):
-        return self.__msg
-
-    @property
-    def is_user(self):
-        return self.__is_user
+        self.channel = channel
+        self.nick = nick
+        self.msg = msg
+        self.is_user = is_user
 
     def __repr__(self):
         txt = 'User' if self.is_user else 'Not a user'
-        return '{} {} ({}): {}'.format(self.channel, self.nick, txt, self.msg)
+        return f'{self.channel} {self.nick} ({txt}): {self.msg}'
@@ -2,7 +2,10 @@
 
 """Starts the bot."""
 
-import json
+try:
+    import orjson as json
+except ImportError:
+    import json
 
 import irc
 
@@ -10,6 +13,14 @@ import irc
 class Bot(irc.IRCBot):
     """Use <handle> for the <irc.IRCBot>'s callback."""
 
+    # Maps each command to a function taking the bot, channel, nick, and
+    # message (see <reply>).
+    __commands = {
+        'help': lambda self, channel, nick, msg: self.__help(nick, channel),
+        'join': lambda self, channel, nick, msg: self.__join_channels(
+            set(msg.split())),
+    }
+
     def __init__(self, trigger, nick, server, channels=None, port=6667,
                  should_log=False):
         """Initializes values.
@@ -34,22 +45,24 @@ class Bot(irc.IRCBot):
         message of the form:
             my_bot: join ##python #android
         """
-        self.__trigger = trigger
+        self.trigger = trigger
+        self.__trigger_len = len(trigger)
+        self.__help_text = _build_help(trigger)
+        self.__show_help_text = ("I didn't understand that. "
+                                 + f'Check my commands with <{nick}: help>.')
         super().__init__(nick, server, channels, port, should_log)
 
-    @property
-    def trigger(self):
-        """Returns this bot's trigger (<str>)."""
-        return self.__trigger
-
     def handle(self, irc_msg):
-        self.log('Got message {}'.format(irc_msg))
-        if irc_msg.msg.startswith(self.trigger):
-            msg = irc_msg.msg[len(self.trigger):]
-            parts = msg.split(' ', 1)
-            cmd = parts[0]
-            msg = parts[1] if len(parts) == 2 else None
-            self.reply(irc_msg.channel, irc_msg.nick, cmd, msg)
+        self.log('Got message %s', irc_msg)
+        if not irc_msg.msg.startswith(self.trigger):
+            return
+        msg = irc_msg.msg[self.__trigger_len:]
+        space = msg.find(' ')
+        if space < 0:
+            cmd, msg = msg, None
+        else:
+            cmd, msg = msg[:space], msg[space + 1:]
+        self.reply(irc_msg.channel, irc_msg.nick, cmd, msg)
 
     def reply(self, channel, nick, cmd, msg=None):
         """Responds to users.
@@ -60,12 +73,11 @@ class Bot(irc.IRCBot):
             cmd -- <str>; e.g.: <'join'>
             msg -- <str>; e.g.: <'##python #android'>
         """
-        if cmd == 'help':
-            self.__help(nick, channel)
-        elif cmd == 'join':
-            self.__join_channels(set(msg.split()))
-        else:
+        handler = self.__commands.get(cmd)
+        if handler is None:
             self.__show_help(nick, channel)
+        else:
+            handler(self, channel, nick, msg)
 
     def __show_help(self, nick, channel):
         """Responds to users incorrectly using the bot.
@@ -74,8 +86,7 @@ class Bot(irc.IRCBot):
             nick -- <str>; nickname of user incorrectly using the bot
             channel -- <str>; channel user <nick> is in
         """
-        reply = ("{}: I didn't understand that. ".format(nick)
-                 + 'Check my commands with <{}: help>.'.format(self.nick))
+        reply = f'{nick}: {self.__show_help_text}'
         self.send_message(reply, channel)
 
     def __join_channels(self, channels):
@@ -85,11 +96,14 @@ class Bot(irc.IRCBot):
         <channels>, then it will state such instead of trying to join
         that channel.
         """
+        new_channels = set()
         for channel in channels:
-            if channel in self.channels:
-                self.send_message("I'm already in {}".format(channel), channel)
+            if self.is_in_channel(channel):
+                self.send_message(f"I'm already in {channel}", channel)
             else:
-                self.join_channel(channel)
+                new_channels.add(channel)
+        if len(new_channels) > 0:
+            self.join_channels(new_channels)
 
     def __help(self, nick, channel):
         """Messages how to use the bot.
@@ -99,18 +113,12 @@ class Bot(irc.IRCBot):
                     help message
             channel -- <str>; the channel to send the help message to
         """
-        commands = [
-            CommandInfo(self.trigger, 'help',
-                        "Explains the bot's commands", 'help'),
-            CommandInfo(self.trigger, 'join', 'Joins channels',
-                        'join #python ##android',
-                        'join <space-separated list of channels>')
-        ]
-        commands = ', '.join([str(cmd) for cmd in commands])
-        self.send_message('{}: Commands => {}'.format(nick, commands), channel)
+        self.send_message(f'{nick}: Commands => {self.__help_text}', channel)
 
 
 class CommandInfo:
+    __slots__ = ('trigger', 'cmd', 'explanation', 'example', 'syntax')
+
     def __init__(self, trigger, cmd, explanation, example, syntax=None):
         """Initializes values.
 
@@ -124,47 +132,36 @@ class CommandInfo:
             syntax -- <str>; how to use command (e.g.,
                       <'join <space-separated list of channels>'>)
         """
-        self.__trigger = trigger
-        self.__cmd = cmd
-        self.__explanation = explanation
-        self.__example = example
-        self.__syntax = syntax
-
-    @property
-    def trigger(self):
-        """Returns this command's trigger (<str>)."""
-        return self.__trigger
-
-    @property
-    def cmd(self):
-        """Returns this command's name (<str>)."""
-        return self.__cmd
-
-    @property
-    def explanation(self):
-        """Returns this command's explanation (<str>)."""
-        return self.__explanation
-
-    @property
-    def example(self):
-        """Returns this command's example (<str>)."""
-        return self.__example
-
-    @property
-    def syntax(self):
-        """Returns this command's syntax (<str> or <None>)."""
-        return self.__syntax
+        self.trigger = trigger
+        self.cmd = cmd
+        self.explanation = explanation
+        self.example = example
+        self.syntax = syntax
 
     def __repr__(self):
-        txt = ' ({})'.format(self.syntax) if self.syntax is not None else ''
-        return '{}{} - {} (e.g., {}{})'.format(
-            self.cmd, txt, self.explanation, self.trigger, self.example)
+        txt = f' ({self.syntax})' if self.syntax is not None else ''
+        return (f'{self.cmd}{txt} - {self.explanation} '
+                + f'(e.g., {self.trigger}{self.example})')
+
+
+def _build_help(trigger):
+    """Returns the list of commands (<str>) sent in help messages.
+
+    <trigger> (<str>) is the trigger of the bot the help is for.
+    """
+    return ', '.join([str(cmd) for cmd in [
+        CommandInfo(trigger, 'help', "Explains the bot's commands", 'help'),
+        CommandInfo(trigger, 'join', 'Joins channels',
+                    'join #python ##android',
+                    'join <space-separated list of channels>')
+    ]])
 
 
 def main():
     """Starts the program."""
-    config = json.load(open('src/config.json'))
-    Bot('{}: '.format(config['nick']), config['nick'], config['server'],
+    with open('src/config.json', 'rb') as f:
+        config = json.loads(f.read())
+    Bot(f"{config['nick']}: ", config['nick'], config['server'],
         set(config['channels']), should_log=True)
 
 